@@ -1,25 +1,336 @@
 # ai_agent.py
 import os
-from openai import OpenAI
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 # ===============================
 # Load environment variables
 # ===============================
 load_dotenv()
 
 # --- Configuration ---
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 MODEL = "openai/gpt-4o"  # OpenRouter GPT-4o model (multimodal + fast)
 
-if not OPENROUTER_API_KEY:
-    raise ValueError("❌ Missing OPENROUTER_API_KEY in .env file!")
+# --- OpenRouter client (built on first call, so importing needs no API key) ---
+@lru_cache(maxsize=None)
+def get_client() -> "OpenAI":
+    from openai import OpenAI
+
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise ValueError("❌ Missing OPENROUTER_API_KEY in .env file!")
 
-# --- Initialize OpenRouter client ---
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=OPENROUTER_API_KEY,
-)
+    start = time.perf_counter()
+    client = OpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key=api_key,
+        max_retries=0,  # retries are handled below so Retry-After and the breaker stay in one place
+    )
+    print(f"🔌 OpenRouter client ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return client
+
+# ===============================
+# Model tiers & task routing
+# ===============================
+def _models_from_env(name: str, default: str) -> List[str]:
+    """Reads a comma-separated model list from the environment."""
+    return [m.strip() for m in os.getenv(name, default).split(",") if m.strip()]
+
+# Each tier is an ordered list of OpenRouter models; later entries are fallbacks.
+MODEL_TIERS: Dict[str, List[str]] = {
+    "fast": _models_from_env("OPENROUTER_FAST_MODELS", "openai/gpt-4o-mini,google/gemini-flash-1.5"),
+    "quality": _models_from_env("OPENROUTER_QUALITY_MODELS", f"{MODEL},anthropic/claude-3.5-sonnet"),
+}
+
+# Bulk/background work goes to the cheap tier, interactive queries keep quality.
+TASK_TIERS: Dict[str, str] = {
+    "summarize": os.getenv("OPENROUTER_SUMMARIZE_TIER", "fast"),
+    "scheduled_summary": os.getenv("OPENROUTER_SCHEDULED_TIER", "fast"),
+    "query": os.getenv("OPENROUTER_QUERY_TIER", "quality"),
+}
+
+STATS_WINDOW = int(os.getenv("OPENROUTER_STATS_WINDOW", "50"))     # calls kept per model
+STATS_TTL = float(os.getenv("OPENROUTER_STATS_TTL", "300"))         # seconds before a sample expires
+MAX_ERROR_RATE = float(os.getenv("OPENROUTER_MAX_ERROR_RATE", "0.5"))  # above this a model is demoted
+SLOW_LATENCY = float(os.getenv("OPENROUTER_SLOW_LATENCY", "10"))      # avg seconds above which a model is demoted
+
+# --- Resilience ---
+# A "round" tries every model in the tier once; backoff only happens between rounds.
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))           # extra rounds after the first
+RETRY_BASE_DELAY = float(os.getenv("OPENROUTER_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("OPENROUTER_RETRY_MAX_DELAY", "20"))
+# Interactive queries get a much smaller budget so a rate-limited tier fails fast.
+QUERY_MAX_RETRIES = int(os.getenv("OPENROUTER_QUERY_MAX_RETRIES", "1"))
+QUERY_RETRY_MAX_DELAY = float(os.getenv("OPENROUTER_QUERY_RETRY_MAX_DELAY", "2"))
+BREAKER_THRESHOLD = int(os.getenv("OPENROUTER_BREAKER_THRESHOLD", "5"))  # consecutive failed asks
+BREAKER_COOLDOWN = float(os.getenv("OPENROUTER_BREAKER_COOLDOWN", "30"))
+HEDGE_QUERIES = os.getenv("OPENROUTER_HEDGE_QUERIES", "false").lower() in ("1", "true", "yes")
+HEDGE_MIN_SAMPLES = 20  # successful calls needed before a model's p95 is trusted
+
+
+class ModelStats:
+    """
+    Rolling latency / error window for a single model. Samples older than `ttl`
+    seconds are dropped, so a model demoted during an outage is measured afresh.
+    """
+
+    def __init__(self, window: int = STATS_WINDOW, ttl: float = STATS_TTL):
+        self.calls = deque(maxlen=window)  # (timestamp, latency_seconds, ok)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self.lock:
+            self.calls.append((time.monotonic(), latency, ok))
+
+    def _recent(self) -> List[tuple]:
+        """Drops expired samples and returns the remaining (latency, ok) pairs."""
+        cutoff = time.monotonic() - self.ttl
+        with self.lock:
+            while self.calls and self.calls[0][0] < cutoff:
+                self.calls.popleft()
+            return [(lat, ok) for _, lat, ok in self.calls]
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._recent())
+
+    @property
+    def error_rate(self) -> float:
+        calls = self._recent()
+        if not calls:
+            return 0.0
+        return sum(1 for _, ok in calls if not ok) / len(calls)
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        latencies = [lat for lat, ok in self._recent() if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    @property
+    def p95_latency(self) -> Optional[float]:
+        latencies = sorted(lat for lat, ok in self._recent() if ok)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling OpenRouter while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed asks and rejects calls for `cooldown`
+    seconds. Once the cooldown passes it is half-open: a single caller is let through
+    as a probe while the rest keep failing fast. A probe failure re-opens it, a
+    success closes it.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return "open"
+            return "half-open"
+
+    def check(self) -> bool:
+        """
+        Raises CircuitOpenError unless the call may proceed. Returns True if the caller
+        holds the half-open probe and must call release_probe() when done.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at >= self.cooldown and not self.probing:
+                self.probing = True
+                return True
+        raise CircuitOpenError("OpenRouter circuit is open; failing fast until the cooldown ends.")
+
+    def release_probe(self):
+        with self.lock:
+            self.probing = False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+breaker = CircuitBreaker()
+
+
+model_stats: Dict[str, ModelStats] = {}
+
+
+def _stats_for(model: str) -> ModelStats:
+    return model_stats.setdefault(model, ModelStats())
+
+
+def select_models(task_type: str = "query") -> List[str]:
+    """
+    Returns the candidate models for a task, best first.
+    Models keep their configured order (first = preferred) unless demoted: first for
+    an error rate over MAX_ERROR_RATE, then for a rolling average latency over
+    SLOW_LATENCY. Samples expire after STATS_TTL, so a demoted model regains its
+    place once its bad samples age out.
+    """
+    tier = TASK_TIERS.get(task_type, TASK_TIERS["query"])
+    models = MODEL_TIERS.get(tier) or [MODEL]
+
+    def score(indexed):
+        index, model = indexed
+        stats = _stats_for(model)
+        latency = stats.avg_latency
+        return (
+            stats.error_rate > MAX_ERROR_RATE,
+            latency is not None and latency > SLOW_LATENCY,
+            index,
+        )
+
+    return [m for _, m in sorted(enumerate(models), key=score)]
+
+
+def router_status() -> Dict[str, object]:
+    """Snapshot of breaker state and per-model health, handy for debug endpoints."""
+    return {
+        "circuit": breaker.state,
+        "models": {
+            model: {
+                "avg_latency": stats.avg_latency,
+                "p95_latency": stats.p95_latency,
+                "error_rate": stats.error_rate,
+                "calls": stats.sample_count,
+            }
+            for model, stats in model_stats.items()
+        },
+    }
+
+
+def _complete(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    completion = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        extra_headers={
+            "HTTP-Referer": "http://localhost:8501",  # optional: for OpenRouter analytics
+            "X-Title": "AI-Agent-Dashboard",
+        },
+    )
+    return completion.choices[0].message.content.strip()
+
+
+def _is_retryable(e: Exception) -> bool:
+    """Connection problems, timeouts, 408/409/429 and 5xx are worth another try."""
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(e, APIConnectionError):
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code in (408, 409, 429) or e.status_code >= 500
+    return False
+
+
+def _retry_after(e: Exception) -> Optional[float]:
+    """Parses a Retry-After header (seconds or HTTP date) from an API error."""
+    response = getattr(e, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _retry_delay(e: Exception, attempt: int, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """Retry-After when the provider sends one, otherwise full-jitter exponential backoff."""
+    retry_after = _retry_after(e)
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def _hedged_complete(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    """
+    Fires a duplicate request if the first one outlives the model's p95 latency and
+    returns whichever answers first. The loser is cancelled on our side only.
+    """
+    p95 = _stats_for(model).p95_latency
+    primary = asyncio.ensure_future(asyncio.to_thread(_complete, model, messages, temperature, max_tokens))
+    if p95 is None:
+        return await primary
+
+    done, _ = await asyncio.wait({primary}, timeout=p95)
+    if done:
+        return primary.result()
+
+    print(f"⏱️ Hedging {model} after {p95:.2f}s (p95)")
+    hedge = asyncio.ensure_future(asyncio.to_thread(_complete, model, messages, temperature, max_tokens))
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            error = task.exception()
+    raise error
+
+
+async def _attempt(model: str, messages: list, temperature: float, max_tokens: int, hedge: bool) -> str:
+    """One call to one model, recorded in its stats unless the error is client-side."""
+    stats = _stats_for(model)
+    start = time.monotonic()
+    try:
+        if hedge:
+            answer = await _hedged_complete(model, messages, temperature, max_tokens)
+        else:
+            # The OpenAI client is blocking; keep it off the event loop.
+            answer = await asyncio.to_thread(_complete, model, messages, temperature, max_tokens)
+    except Exception as e:
+        if _is_retryable(e):
+            # Bad request / auth / config errors aren't the model's fault; only these count.
+            stats.record(time.monotonic() - start, ok=False)
+        raise
+    stats.record(time.monotonic() - start, ok=True)
+    return answer
 
 # ===============================
 # Main function used by your app
@@ -28,42 +339,69 @@ async def ask_openai(
     prompt: str,
     system_prompt: str = "You are a helpful AI data analyst that provides concise insights.",
     temperature: float = 0.3,
-    max_tokens: int = 512
+    max_tokens: int = 512,
+    task_type: str = "query",
+    hedge: Optional[bool] = None,
 ):
     """
-    Ask OpenRouter's GPT-4o model a question and get a response.
-    Automatically handles errors and returns fallback text if API fails.
+    Ask OpenRouter a question, routed to the model tier configured for `task_type`.
+    A transient error (connection, 408/409/429, 5xx) fails over to the next model at
+    once; backoff only happens after every model in the tier has failed, and is capped
+    much lower for interactive queries. Non-retryable errors (bad request, auth,
+    missing key) are raised straight away and don't count towards the circuit breaker.
+    Raises CircuitOpenError while the provider is considered down and RuntimeError if
+    every round fails. `hedge` defaults to OPENROUTER_HEDGE_QUERIES for queries.
     """
+    probe = breaker.check()
+    if hedge is None:
+        hedge = HEDGE_QUERIES and task_type == "query"
+    if task_type == "query":
+        max_retries, max_delay = QUERY_MAX_RETRIES, QUERY_RETRY_MAX_DELAY
+    else:
+        max_retries, max_delay = MAX_RETRIES, RETRY_MAX_DELAY
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+    errors = []
     try:
-        completion = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=temperature,
-            max_tokens=max_tokens,
-            extra_headers={
-                "HTTP-Referer": "http://localhost:8501",  # optional: for OpenRouter analytics
-                "X-Title": "AI-Agent-Dashboard",
-            },
-        )
+        for attempt in range(max_retries + 1):
+            delays = []
+            for model in select_models(task_type):
+                try:
+                    answer = await _attempt(model, messages, temperature, max_tokens, hedge)
+                    breaker.record_success()
+                    return answer
+                except Exception as e:
+                    print(f"⚠️ OpenRouter API error ({model}): {e}")
+                    if not _is_retryable(e):
+                        # Every other model would reject the same request.
+                        raise
+                    errors.append(f"{model}: {e}")
+                    delays.append(_retry_delay(e, attempt, max_delay))
 
-        # ✅ Return the model’s answer
-        return completion.choices[0].message.content.strip()
+            if attempt < max_retries:
+                # Wait only as long as the soonest model asked us to.
+                delay = min(delays)
+                print(f"🔁 All models failed for '{task_type}' (round {attempt + 1}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
 
-    except Exception as e:
-        print(f"⚠️ OpenRouter API error: {e}")
-        return f"(mocked fallback) Response to: '{prompt[:50]}...'"
+        # Only reached when every model failed provider-side in every round.
+        breaker.record_failure()
+        raise RuntimeError(f"All models failed for task '{task_type}': {'; '.join(errors)}")
+    finally:
+        if probe:
+            breaker.release_probe()
 
 # ===============================
 # Standalone test (optional)
 # ===============================
 if __name__ == "__main__":
-    import asyncio
-
     async def test():
         response = await ask_openai("Give me 3 creative startup ideas using AI.")
         print("\n🧠 AI Response:\n", response)
+        print("\n📈 Router status:\n", router_status())
 
     asyncio.run(test())
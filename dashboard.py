@@ -103,12 +103,15 @@ with st.sidebar:
     st.markdown("<div class='section-header'>📊 Data Sync</div>", unsafe_allow_html=True)
     if st.button("🔄 Sync Google Sheet"):
         with st.spinner("Syncing Google Sheet with Supabase..."):
-            safe_post(f"{API_URL}/sync-sheet", {
+            sync_result = safe_post(f"{API_URL}/sync-sheet", {
                 "spreadsheet_id": SPREADSHEET_ID,
                 "sheet_name": SHEET_NAME,
                 "org_id": ORG_ID,
             })
-        st.markdown("<div class='success-msg'>✅ Sheet synced successfully!</div>", unsafe_allow_html=True)
+        if sync_result and sync_result.get("status") == "unchanged":
+            st.markdown("<div class='success-msg'>✅ Sheet unchanged — already in sync</div>", unsafe_allow_html=True)
+        elif sync_result:
+            st.markdown("<div class='success-msg'>✅ Sheet synced successfully!</div>", unsafe_allow_html=True)
 
     # --- AI Agent ---
     st.markdown("<div class='section-header'>🤖 AI Automation</div>", unsafe_allow_html=True)
@@ -125,6 +128,8 @@ with st.sidebar:
                 if "latest_data" in st.session_state:
                     del st.session_state["latest_data"]
 
+                # An unchanged sheet makes this sync cheap, but Supabase may still have changed
+                # (seeding, other clients), so /rows is always re-fetched below.
                 sync_res = requests.post(f"{API_URL}/sync-sheet", headers=HEADERS, json={
                     "spreadsheet_id": SPREADSHEET_ID,
                     "sheet_name": SHEET_NAME,
@@ -1,18 +1,27 @@
 # google_sync.py
 import os
 import json
-from google.oauth2.service_account import Credentials
-import gspread
-from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound, APIError
-from typing import List, Dict, Any
+import hashlib
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 
-# Google Sheets API scope
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+if TYPE_CHECKING:
+    import gspread
 
-def get_gspread_client() -> gspread.client.Client:
+# Google Sheets API scope (+ Drive metadata, used only to read the file's modifiedTime)
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.metadata.readonly",
+]
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+
+@lru_cache(maxsize=None)
+def _get_credentials():
     """
-    Initializes and returns an authorized gspread client.
-    Uses GOOGLE_CREDS_JSON environment variable only (Render deployment safe).
+    Builds service account credentials from the GOOGLE_CREDS_JSON environment variable
+    only (Render deployment safe). google-auth is imported here so it doesn't slow
+    down app startup.
     """
     google_creds_json = os.getenv("GOOGLE_CREDS_JSON")
 
@@ -23,18 +32,42 @@ def get_gspread_client() -> gspread.client.Client:
         )
 
     try:
+        from google.oauth2.service_account import Credentials
+
         creds_dict = json.loads(google_creds_json)
-        creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-        return gspread.authorize(creds)
+        return Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
     except json.JSONDecodeError:
         raise EnvironmentError("Invalid GOOGLE_CREDS_JSON format — must be valid JSON.")
+    except Exception as e:
+        raise EnvironmentError(f"Failed to load Google service account credentials: {e}")
+
+@lru_cache(maxsize=None)
+def get_gspread_client() -> "gspread.client.Client":
+    """
+    Initializes and returns an authorized gspread client.
+    gspread is imported here so it doesn't slow down app startup.
+    """
+    creds = _get_credentials()
+    try:
+        import gspread
+
+        return gspread.authorize(creds)
     except Exception as e:
         raise EnvironmentError(f"Failed to authorize Google Sheets client: {e}")
 
+@lru_cache(maxsize=None)
+def _get_drive_session():
+    """Authorized HTTP session for direct Drive API metadata calls."""
+    from google.auth.transport.requests import AuthorizedSession
+
+    return AuthorizedSession(_get_credentials())
+
 def read_sheet_values(spreadsheet_id: str, sheet_name: str = "Sheet1") -> List[Dict[str, Any]]:
     """
     Reads all records from a specified Google Sheet and Worksheet.
     """
+    from gspread.exceptions import SpreadsheetNotFound, WorksheetNotFound, APIError
+
     try:
         client = get_gspread_client()
         sh = client.open_by_key(spreadsheet_id)
@@ -49,3 +82,42 @@ def read_sheet_values(spreadsheet_id: str, sheet_name: str = "Sheet1") -> List[D
         raise RuntimeError(f"Google Sheets API Error: {e}")
     except Exception as e:
         raise RuntimeError(f"An unexpected error occurred during sheet read: {e}")
+
+# ======================================================
+# Change detection
+# ======================================================
+# Last synced state per (org_id, spreadsheet_id, sheet_name). Kept in memory, so the
+# first sync after a restart is always a full one.
+_sync_state: Dict[Tuple[str, str, str], Dict[str, Optional[str]]] = {}
+_sync_state_lock = threading.Lock()
+
+def get_sheet_revision(spreadsheet_id: str) -> Optional[str]:
+    """
+    Returns the spreadsheet's Drive modifiedTime, a marker that changes on any edit.
+    This is a single Drive files.get call; no Sheets request is made. Returns None if it
+    can't be fetched (e.g. Drive API disabled), so callers fall back to a full read.
+    """
+    try:
+        resp = _get_drive_session().get(
+            f"{DRIVE_FILES_URL}/{spreadsheet_id}",
+            params={"fields": "modifiedTime", "supportsAllDrives": "true"},
+            timeout=10,
+        )
+        resp.raise_for_status()
+        return resp.json().get("modifiedTime")
+    except Exception as e:
+        print(f"⚠️ Could not read revision for {spreadsheet_id}: {e}")
+        return None
+
+def fingerprint_rows(rows: List[Dict[str, Any]]) -> str:
+    """Stable content hash of sheet records, used when no revision marker is available."""
+    encoded = json.dumps(rows, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def get_sync_state(key: Tuple[str, str, str]) -> Dict[str, Optional[str]]:
+    with _sync_state_lock:
+        return dict(_sync_state.get(key, {}))
+
+def record_sync_state(key: Tuple[str, str, str], revision: Optional[str], fingerprint: str):
+    with _sync_state_lock:
+        _sync_state[key] = {"revision": revision, "fingerprint": fingerprint}
@@ -0,0 +1,167 @@
+# mock_data.py
+import math
+import threading
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAX_ROWS = 5_000_000
+DEFAULT_BATCH_SIZE = 1000
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1  # NumPy's integer generator range
+BLOCK_ROWS = 1000  # generation unit; fixed so output doesn't depend on batch_size
+
+# Column name -> spec. Supported types:
+#   label:  random value from `values` + " <row number>"  (unique-ish names)
+#   choice: random value from `values`
+#   int:    uniform integer in [min, max]
+#   float:  uniform float in [min, max], rounded to `decimals`
+#   date:   uniform ISO date in [start, end]
+DEFAULT_SCHEMA: Dict[str, Dict[str, Any]] = {
+    "Name": {"type": "label", "values": ["Alice", "Bob", "Charlie", "Diana", "Ethan", "Fiona", "George", "Hannah", "Ivan", "Julia"]},
+    "Age": {"type": "int", "min": 22, "max": 55},
+    "Department": {"type": "choice", "values": ["Engineering", "HR", "Marketing", "Finance", "Sales", "Support", "Operations", "Research"]},
+    "City": {"type": "choice", "values": ["Delhi", "Mumbai", "Bangalore", "Pune", "Hyderabad", "Chennai", "Kolkata", "Ahmedabad"]},
+    "Salary": {"type": "int", "min": 30000, "max": 120000},
+    "Joining_Date": {"type": "date", "start": "2020-01-01", "end": "2024-12-28"},
+}
+
+# Latest seeding progress per org_id, readable while a background seed runs.
+seed_progress: Dict[str, Dict[str, Any]] = {}
+_progress_lock = threading.Lock()
+
+
+def _is_number(value: Any) -> bool:
+    """True for finite ints/floats (bools, NaN and Infinity excluded)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, bool)) or _is_number(value)
+
+
+def validate_schema(schema: Dict[str, Dict[str, Any]]):
+    """Raises ValueError if a column spec is unusable."""
+    if not isinstance(schema, dict) or not schema:
+        raise ValueError("Schema must define at least one column.")
+    for name, spec in schema.items():
+        if not isinstance(spec, dict):
+            raise ValueError(f"Column '{name}': spec must be an object with a 'type'.")
+        kind = spec.get("type")
+        if kind in ("label", "choice"):
+            values = spec.get("values")
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"Column '{name}': '{kind}' needs a non-empty 'values' list.")
+            if not all(_is_scalar(v) for v in values):
+                raise ValueError(f"Column '{name}': 'values' must be strings, numbers or booleans.")
+        elif kind in ("int", "float"):
+            low, high = spec.get("min"), spec.get("max")
+            numeric = _is_number(low) and _is_number(high)
+            if kind == "int":
+                numeric = numeric and isinstance(low, int) and isinstance(high, int)
+            if not numeric:
+                expected = "integer" if kind == "int" else "numeric"
+                raise ValueError(f"Column '{name}': '{kind}' needs {expected} 'min' and 'max'.")
+            if low > high:
+                raise ValueError(f"Column '{name}': 'min' is greater than 'max'.")
+            if kind == "int" and (low < INT64_MIN or high > INT64_MAX):
+                raise ValueError(f"Column '{name}': 'min'/'max' must fit in a 64-bit integer.")
+            if kind == "float":
+                if not math.isfinite(high - low):
+                    raise ValueError(f"Column '{name}': 'max' - 'min' is too large.")
+                decimals = spec.get("decimals", 2)
+                if isinstance(decimals, bool) or not isinstance(decimals, int):
+                    raise ValueError(f"Column '{name}': 'decimals' must be an integer.")
+        elif kind == "date":
+            try:
+                start, end = date.fromisoformat(spec["start"]), date.fromisoformat(spec["end"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Column '{name}': 'date' needs ISO 'start' and 'end'.")
+            if start > end:
+                raise ValueError(f"Column '{name}': 'start' is after 'end'.")
+        else:
+            raise ValueError(f"Column '{name}': unknown type '{kind}'.")
+
+
+def _generate_column(rng, spec: Dict[str, Any], row_numbers) -> List[Any]:
+    """Generates one column for a block of rows with vectorized NumPy ops."""
+    import numpy as np
+
+    n = len(row_numbers)
+    kind = spec["type"]
+    if kind == "label":
+        picked = rng.choice(np.asarray(spec["values"], dtype=str), n)
+        return np.char.add(np.char.add(picked, " "), row_numbers.astype(str)).tolist()
+    if kind == "choice":
+        return rng.choice(np.asarray(spec["values"], dtype=object), n).tolist()
+    if kind == "int":
+        return rng.integers(spec["min"], spec["max"], size=n, endpoint=True).tolist()
+    if kind == "float":
+        return rng.uniform(spec["min"], spec["max"], n).round(spec.get("decimals", 2)).tolist()
+    # date
+    start = np.datetime64(spec["start"], "D")
+    span = int((np.datetime64(spec["end"], "D") - start).astype(int))
+    return (start + rng.integers(0, span, size=n, endpoint=True)).astype(str).tolist()
+
+
+def _generate_block(entropy: int, schema: Dict[str, Dict[str, Any]], block: int) -> List[Dict[str, Any]]:
+    """
+    Generates rows block*BLOCK_ROWS+1 .. (block+1)*BLOCK_ROWS. Each column draws from its
+    own stream keyed by (block, column position), so a row's values depend only on the
+    seed and its row number.
+    """
+    import numpy as np
+
+    row_numbers = np.arange(block * BLOCK_ROWS + 1, (block + 1) * BLOCK_ROWS + 1)
+    columns = list(schema)
+    values = [
+        _generate_column(
+            np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(block, position))),
+            schema[column],
+            row_numbers,
+        )
+        for position, column in enumerate(columns)
+    ]
+    return [dict(zip(columns, record)) for record in zip(*values)]
+
+
+def iter_mock_batches(
+    rows: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    seed: Optional[int] = None,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Yields (first row number, records) batches of at most `batch_size` records.
+    At most one batch plus one block is in memory at a time. Rows are generated in
+    fixed-size blocks, so the same seed gives the same rows whatever `batch_size`
+    or `rows` is.
+    """
+    import numpy as np
+
+    schema = schema or DEFAULT_SCHEMA
+    validate_schema(schema)
+    entropy = np.random.SeedSequence(seed).entropy  # random when seed is None
+
+    pending: List[Dict[str, Any]] = []
+    next_row = 1
+    for block in range((rows + BLOCK_ROWS - 1) // BLOCK_ROWS):
+        # Blocks are always generated in full, then trimmed, so `rows` never shifts values.
+        records = _generate_block(entropy, schema, block)
+        pending.extend(records[: rows - block * BLOCK_ROWS])
+        while len(pending) >= batch_size:
+            yield next_row, pending[:batch_size]
+            pending = pending[batch_size:]
+            next_row += batch_size
+    if pending:
+        yield next_row, pending
+
+
+def update_progress(org_id: str, **fields):
+    with _progress_lock:
+        seed_progress.setdefault(org_id, {}).update(fields)
+
+
+def get_progress(org_id: str) -> Dict[str, Any]:
+    with _progress_lock:
+        return dict(seed_progress.get(org_id, {}))
@@ -0,0 +1,138 @@
+# prompt_encoding.py
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Envelope columns added by the sync layer; they carry no signal for the model.
+# Only ever dropped from the outer record, never from the sheet's own `data` columns.
+METADATA_COLUMNS = {"id", "org_id", "sheet_row_id", "synced_at", "created_at", "updated_at"}
+
+# Header of the optional leading column added by `labels` (e.g. record numbers).
+LABEL_COLUMN = "record_no"
+
+MAX_CELL_CHARS = 80
+CHARS_PER_TOKEN = 4  # rough average for English/tabular text on GPT-style tokenizers
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token); good enough for prompt budgeting."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def flatten_row(row: Dict[str, Any], drop_columns: Iterable[str] = METADATA_COLUMNS) -> Dict[str, Any]:
+    """
+    Unwraps a `sheets_rows` record into its sheet columns.
+    Envelope (metadata) columns are dropped from the outer record; a dict `data` field
+    is then expanded in place, keeping every sheet column, even ones named like metadata.
+    """
+    drop = set(drop_columns)
+    outer = {k: v for k, v in row.items() if k not in drop}
+    data = outer.get("data")
+    if isinstance(data, dict):
+        del outer["data"]
+        return {**outer, **data}
+    return outer
+
+
+def _cell(value: Any, fmt: str, max_chars: int) -> str:
+    text = "" if value is None else str(value)
+    text = " ".join(text.split())  # collapse tabs/newlines so each row stays on one line
+    if fmt == "markdown":
+        text = text.replace("|", "\\|")
+    if len(text) > max_chars:
+        text = text[: max_chars - 1] + "…"
+    if fmt == "csv" and ("," in text or '"' in text):
+        text = '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _line(cells: List[str], fmt: str) -> str:
+    if fmt == "markdown":
+        return "| " + " | ".join(cells) + " |"
+    return ("\t" if fmt == "tsv" else ",").join(cells)
+
+
+def _table_lines(
+    rows: List[Dict[str, Any]],
+    fmt: str,
+    max_cell_chars: int,
+    drop_columns: Iterable[str],
+    labels: Optional[List[Any]] = None,
+) -> Tuple[List[str], List[str]]:
+    """Returns (header lines, one line per row) for the given format."""
+    if fmt not in ("tsv", "csv", "markdown"):
+        raise ValueError(f"Unsupported prompt table format: {fmt}")
+    if labels is not None and len(labels) != len(rows):
+        raise ValueError("labels must have one entry per row")
+
+    flat = [flatten_row(r, drop_columns) for r in rows]
+    columns: List[str] = []
+    for r in flat:
+        columns.extend(c for c in r if c not in columns)
+
+    # Labels are kept apart from the row data so a sheet column can never overwrite them.
+    header_cells = ([LABEL_COLUMN] if labels is not None else []) + columns
+    header = [_line([_cell(c, fmt, max_cell_chars) for c in header_cells], fmt)]
+    if fmt == "markdown":
+        header.append(_line(["---"] * len(header_cells), fmt))
+    body = []
+    for i, r in enumerate(flat):
+        cells = [r.get(c) for c in columns]
+        if labels is not None:
+            cells.insert(0, labels[i])
+        body.append(_line([_cell(v, fmt, max_cell_chars) for v in cells], fmt))
+    return header, body
+
+
+def encode_rows(
+    rows: List[Dict[str, Any]],
+    fmt: str = "tsv",
+    max_cell_chars: int = MAX_CELL_CHARS,
+    drop_columns: Iterable[str] = METADATA_COLUMNS,
+    labels: Optional[List[Any]] = None,
+) -> str:
+    """
+    Renders rows as a compact table with the header written once.
+    `fmt` is "tsv" (default, cheapest), "csv" or "markdown". Long cells are truncated.
+    `labels`, if given, become a leading LABEL_COLUMN (one value per row).
+    """
+    if not rows:
+        return ""
+    header, body = _table_lines(rows, fmt, max_cell_chars, drop_columns, labels)
+    return "\n".join(header + body)
+
+
+def fit_rows(
+    rows: List[Dict[str, Any]],
+    token_budget: int,
+    fmt: str = "tsv",
+    max_cell_chars: int = MAX_CELL_CHARS,
+    drop_columns: Iterable[str] = METADATA_COLUMNS,
+) -> Tuple[str, int]:
+    """
+    Encodes as many leading rows as fit in `token_budget` (estimated). The header only
+    has columns present in the included rows. Returns (table text, rows included);
+    ("", 0) means no rows were given or even a single row doesn't fit.
+    """
+    def encoded(count: int) -> str:
+        return encode_rows(rows[:count], fmt, max_cell_chars, drop_columns)
+
+    # Cost only grows with the row count, so binary search for the largest fit.
+    low, high = 0, len(rows)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(encoded(mid)) <= token_budget:
+            low = mid
+        else:
+            high = mid - 1
+    return (encoded(low), low) if low else ("", 0)
+
+
+def parse_numbered_lines(text: str) -> Dict[int, str]:
+    """Parses "<n>: <text>" lines (also "<n>." / "<n>)") from a model answer into {n: text}."""
+    parsed: Dict[int, str] = {}
+    for line in text.splitlines():
+        match = re.match(r"^\s*#?(\d+)\s*[:.)\-]\s*(.+?)\s*$", line)
+        if match:
+            parsed.setdefault(int(match.group(1)), match.group(2))
+    return parsed
@@ -1,39 +1,58 @@
-
 # supabase_client.py
-from supabase import create_client, Client
 from dotenv import load_dotenv
 import os
-from typing import Optional
+import time
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # Load environment variables
 load_dotenv()
 
-# --- Configuration ---
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-ANON_KEY = os.getenv("SUPABASE_ANON_KEY") 
+# Clients are built on first use so importing this module needs neither
+# credentials nor the (slow to import) supabase package.
+
+
+def _create_client(url: str, key: str) -> "Client":
+    from supabase import create_client
+
+    start = time.perf_counter()
+    client = create_client(url, key)
+    print(f"🔌 Supabase client ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return client
+
 
-# Check for critical values
-if not SUPABASE_URL:
-    raise EnvironmentError("Missing SUPABASE_URL in env")
-if not SERVICE_KEY:
-    raise EnvironmentError("Missing SUPABASE_SERVICE_ROLE_KEY in env")
-if not ANON_KEY:
-    # This is a warning, as RLS-enforced operations will fail without it
-    print("Warning: SUPABASE_ANON_KEY missing. RLS-enforcing client cannot be initialized.")
+def _supabase_url() -> str:
+    url = os.getenv("SUPABASE_URL")
+    if not url:
+        raise EnvironmentError("Missing SUPABASE_URL in env")
+    return url
 
 
 # --------------------------------------------------------------------------
 # 1. SERVICE ROLE CLIENT (Admin/Bypasses RLS)
 #    - Use this ONLY for privileged, server-to-server operations (like /sync-sheet upsert).
 # --------------------------------------------------------------------------
-service_role_client: Client = create_client(SUPABASE_URL, SERVICE_KEY)
+@lru_cache(maxsize=None)
+def get_service_role_client() -> "Client":
+    url = _supabase_url()
+    service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not service_key:
+        raise EnvironmentError("Missing SUPABASE_SERVICE_ROLE_KEY in env")
+    return _create_client(url, service_key)
 
 
 # --------------------------------------------------------------------------
 # 2. RLS-ENFORCING CLIENT (User/Respects RLS)
 #    - Use this for all user-facing reads/writes. Requires a JWT token to be set.
 # --------------------------------------------------------------------------
-rls_enforcing_client: Optional[Client] = None
-if ANON_KEY:
-    rls_enforcing_client = create_client(SUPABASE_URL, ANON_KEY)
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_rls_enforcing_client() -> Optional["Client"]:
+    anon_key = os.getenv("SUPABASE_ANON_KEY")
+    if not anon_key:
+        # This is a warning, as RLS-enforced operations will fail without it
+        print("Warning: SUPABASE_ANON_KEY missing. RLS-enforcing client cannot be initialized.")
+        return None
+    return _create_client(_supabase_url(), anon_key)
@@ -0,0 +1,65 @@
+import pytest
+
+import mock_data
+
+
+def _column(**spec):
+    return {"x": spec}
+
+
+@pytest.mark.parametrize("schema", [
+    _column(type="int", min=0, max=2 ** 70),
+    _column(type="int", min=-2 ** 64, max=0),
+    _column(type="int", min="a", max=3),
+    _column(type="int", min=1.5, max=3),
+    _column(type="int", min=True, max=3),
+    _column(type="float", min=0, max=float("nan")),
+    _column(type="float", min=float("-inf"), max=1),
+    _column(type="float", min=-1e308, max=1e308),
+    _column(type="float", min=0, max=1, decimals=True),
+    _column(type="float", min=0, max=1, decimals=1.5),
+    _column(type="choice", values="abc"),
+    _column(type="choice", values=[]),
+    _column(type="choice", values=[{"a": 1}]),
+    _column(type="label", values=[["a"], "b"]),
+    _column(type="choice", values=[float("nan")]),
+    _column(type="int", min=5, max=3),
+    _column(type="date", start="2024-02-01", end="2024-01-01"),
+    _column(type="date", start=20240101, end="2024-02-01"),
+    _column(type="uuid"),
+    {"x": "int"},
+    {},
+])
+def test_validate_schema_rejects_bad_specs(schema):
+    with pytest.raises(ValueError):
+        mock_data.validate_schema(schema)
+
+
+def test_validate_schema_accepts_edge_values():
+    mock_data.validate_schema({
+        "big": {"type": "int", "min": mock_data.INT64_MIN, "max": mock_data.INT64_MAX},
+        "ratio": {"type": "float", "min": 0, "max": 2.5, "decimals": 3},
+        "flag": {"type": "choice", "values": [True, False, 1, "x"]},
+    })
+    mock_data.validate_schema(mock_data.DEFAULT_SCHEMA)
+
+
+def test_extreme_int_bounds_generate():
+    schema = {"big": {"type": "int", "min": mock_data.INT64_MIN, "max": mock_data.INT64_MAX}}
+    (_, records), = mock_data.iter_mock_batches(5, seed=1, schema=schema)
+    assert len(records) == 5
+
+
+def _all_rows(rows, batch_size, seed=7):
+    return [r for _, batch in mock_data.iter_mock_batches(rows, batch_size, seed) for r in batch]
+
+
+def test_same_seed_same_rows_regardless_of_batch_size_or_rows():
+    rows = _all_rows(2500, 700)
+    assert rows == _all_rows(2500, 333)
+    assert rows[:1200] == _all_rows(1200, 1000)
+
+
+def test_batches_are_bounded_and_numbered():
+    starts = [(start, len(batch)) for start, batch in mock_data.iter_mock_batches(2500, 700, seed=1)]
+    assert starts == [(1, 700), (701, 700), (1401, 700), (2101, 400)]